@@ -9,6 +9,8 @@ from botocore.exceptions import ClientError
 import logging
 import yaml
 import sys
+import time
+from recorder import TrafficRecorder
 
 # Configure logging
 logging.basicConfig(
@@ -25,7 +27,7 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # API Configuration
-config_path = os.path.join(os.path.dirname(__file__), 'config.yml')
+config_path = os.environ.get('APP_CONFIG') or os.path.join(os.path.dirname(__file__), 'config.yml')
 with open(config_path, 'r') as config_file:
     config = yaml.safe_load(config_file)
 
@@ -54,6 +56,74 @@ except Exception as e:
     logger.error(f"Failed to initialize AWS Cost Explorer client: {str(e)}")
     ce_client = None
 
+# Traffic recording configuration (optional, see replay.py)
+recording_config = config.get('recording') or {}
+recorder = None
+if recording_config.get('enabled'):
+    # Relative paths are resolved next to app.py, like config.yml
+    recording_path = os.path.join(os.path.dirname(__file__), recording_config.get('path', 'requests.jsonl'))
+    recorder = TrafficRecorder(
+        recording_path,
+        secrets=[API_KEY, AWS_ACCESS_KEY, AWS_SECRET_KEY],
+        flush_interval=recording_config.get('flush_interval', 1.0),
+        batch_size=recording_config.get('batch_size', 100)
+    )
+
+
+def current_exchange():
+    """
+    Return the exchange being recorded on this thread, if recording is enabled
+    """
+    if recorder:
+        return recorder.current()
+    return None
+
+
+def post_to_mistral(headers, payload):
+    """
+    Send a chat completion request to the Mistral API, recording it if enabled
+    """
+    exchange = current_exchange()
+    started = time.perf_counter()
+    try:
+        response = requests.post(
+            MISTRAL_API_URL,
+            headers=headers,
+            json=payload,
+            timeout=30  # Add timeout to avoid hanging requests
+        )
+    except Exception as e:
+        if exchange:
+            exchange.add_mistral_call(payload, None, None, round((time.perf_counter() - started) * 1000, 2), error=f"{type(e).__name__}: {str(e)}")
+        raise
+
+    if exchange:
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        exchange.add_mistral_call(payload, response.status_code, body, round((time.perf_counter() - started) * 1000, 2),
+                                  text=response.text)
+    return response
+
+
+def call_cost_explorer(client, operation, **params):
+    """
+    Call a Cost Explorer operation, recording it if enabled
+    """
+    exchange = current_exchange()
+    started = time.perf_counter()
+    try:
+        response = getattr(client, operation)(**params)
+    except Exception as e:
+        if exchange:
+            exchange.add_cost_explorer_call(operation, params, None, round((time.perf_counter() - started) * 1000, 2), error=f"{type(e).__name__}: {str(e)}")
+        raise
+
+    if exchange:
+        exchange.add_cost_explorer_call(operation, params, response, round((time.perf_counter() - started) * 1000, 2))
+    return response
+
 
 @app.route('/')
 def index():
@@ -90,7 +160,9 @@ def get_aws_cost_summary(start_date=None, end_date=None, granularity="MONTHLY"):
         logger.info(f"Getting cost summary from {start_date} to {end_date} with {granularity} granularity")
 
         # Call AWS Cost Explorer API
-        response = ce_client.get_cost_and_usage(
+        response = call_cost_explorer(
+            ce_client,
+            'get_cost_and_usage',
             TimePeriod={
                 'Start': start_date,
                 'End': end_date
@@ -168,7 +240,9 @@ def get_aws_cost_forecast(days=30, granularity="MONTHLY"):
         logger.info(f"Getting cost forecast from {start_date} to {end_date} with {granularity} granularity")
 
         # Call AWS Cost Explorer API for forecast
-        response = ce_client.get_cost_forecast(
+        response = call_cost_explorer(
+            ce_client,
+            'get_cost_forecast',
             TimePeriod={
                 'Start': start_date,
                 'End': end_date
@@ -234,7 +308,9 @@ def get_aws_service_costs(service_name, start_date=None, end_date=None, granular
         logger.info(f"Getting costs for service {service_name} from {start_date} to {end_date}")
 
         # Call AWS Cost Explorer API
-        response = ce_client.get_cost_and_usage(
+        response = call_cost_explorer(
+            ce_client,
+            'get_cost_and_usage',
             TimePeriod={
                 'Start': start_date,
                 'End': end_date
@@ -369,6 +445,28 @@ def test_aws():
 
 @app.route('/api/chat', methods=['POST', 'GET'])
 def chat():
+    """
+    Entry point for chat requests; records the exchange when recording is enabled
+    """
+    if not recorder or request.method != 'POST':
+        return handle_chat()
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        recorder.begin(data)
+    else:
+        # Keep the raw body so replay sends the same malformed request
+        recorder.begin(None, raw_body=request.get_data(as_text=True), content_type=request.content_type)
+    try:
+        response = app.make_response(handle_chat())
+        recorder.finish(response.status_code, response.get_json(silent=True))
+        return response
+    except Exception:
+        recorder.finish(500, None)
+        raise
+
+
+def handle_chat():
     """
     Handles chat interactions with the Mistral API,
     including function calling for AWS cost management functions.
@@ -499,12 +597,7 @@ def chat():
 
         # Make the API request with error handling
         try:
-            response = requests.post(
-                MISTRAL_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=30  # Add timeout to avoid hanging requests
-            )
+            response = post_to_mistral(headers, payload)
 
             logger.info(f"Received response with status code: {response.status_code}")
 
@@ -554,17 +647,29 @@ def chat():
 
                     logger.info(f"Executing function: {function_name} with args: {function_args}")
 
+                    exchange = current_exchange()
+                    if exchange:
+                        exchange.start_tool_call(function_name, function_args)
+
                     # Execute the appropriate function
                     result = None
-                    if function_name == "get_aws_cost_summary":
-                        result = get_aws_cost_summary(**function_args)
-                    elif function_name == "get_aws_cost_forecast":
-                        result = get_aws_cost_forecast(**function_args)
-                    elif function_name == "get_aws_service_costs":
-                        result = get_aws_service_costs(**function_args)
-                    else:
-                        logger.warning(f"Unknown function requested: {function_name}")
-                        result = {"error": f"Unknown function: {function_name}"}
+                    try:
+                        if function_name == "get_aws_cost_summary":
+                            result = get_aws_cost_summary(**function_args)
+                        elif function_name == "get_aws_cost_forecast":
+                            result = get_aws_cost_forecast(**function_args)
+                        elif function_name == "get_aws_service_costs":
+                            result = get_aws_service_costs(**function_args)
+                        else:
+                            logger.warning(f"Unknown function requested: {function_name}")
+                            result = {"error": f"Unknown function: {function_name}"}
+                    except Exception as e:
+                        if exchange:
+                            exchange.finish_tool_call(None, error=f"{type(e).__name__}: {str(e)}")
+                        raise
+
+                    if exchange:
+                        exchange.finish_tool_call(result)
 
                     # Add function result as a tool message
                     messages.append({
@@ -583,12 +688,7 @@ def chat():
                     "tool_choice": "auto"
                 }
 
-                response = requests.post(
-                    MISTRAL_API_URL,
-                    headers=headers,
-                    json=follow_up_payload,
-                    timeout=30
-                )
+                response = post_to_mistral(headers, follow_up_payload)
 
                 if response.status_code != 200:
                     logger.error(f"Follow-up API error: {response.status_code} - {response.text}")
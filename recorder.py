@@ -0,0 +1,260 @@
+import atexit
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Record type written for each /api/chat exchange (replay ignores any other lines)
+EXCHANGE_TYPE = "chat_exchange"
+
+REDACTED = "[REDACTED]"
+
+# Dictionary keys whose values are always redacted from recordings
+SENSITIVE_KEYS = re.compile(
+    r'^(authorization|.*api[_-]?key|.*secret.*|.*passw(or)?d.*|.*credential.*|.*access[_-]?key.*'
+    r'|((access|refresh|session|auth|bearer)[_-]?)?token)$',
+    re.IGNORECASE
+)
+
+# Record fields holding captured traffic; only these are scrubbed, so the
+# recorder's own ids and timings are written untouched
+CAPTURED_FIELDS = ('request', 'raw_request', 'mistral_calls', 'tool_calls', 'response')
+
+# Keys that only carry transport metadata (request ids, HTTP headers)
+DROPPED_KEYS = {'ResponseMetadata'}
+
+# Patterns scrubbed from every string value, in order
+PII_PATTERNS = [
+    (re.compile(r'Bearer\s+[A-Za-z0-9\-._~+/]+=*'), 'Bearer ' + REDACTED),
+    (re.compile(r'\b(?:AKIA|ASIA)[0-9A-Z]{16}\b'), '[AWS_ACCESS_KEY]'),
+    (re.compile(r'\b[\w.+-]+@[\w-]+\.[\w.-]+\b'), '[EMAIL]'),
+    (re.compile(r'arn:aws[\w-]*:[^\s"]+'), '[ARN]'),
+    (re.compile(r'(?<![\d.])\d{12}(?![\d.])'), '[ACCOUNT_ID]'),
+    (re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b'), '[IP_ADDRESS]'),
+    (re.compile(r'(?<![\w.])(?:\+?\d{1,3}[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]\d{4}\b'), '[PHONE]'),
+]
+
+
+def sanitize(value, secrets=()):
+    """
+    Return a JSON-safe copy of value with credentials and PII scrubbed
+    """
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            if key in DROPPED_KEYS:
+                continue
+            if isinstance(key, str) and SENSITIVE_KEYS.search(key) and not isinstance(item, (dict, list)):
+                cleaned[key] = REDACTED
+            else:
+                cleaned[key] = sanitize(item, secrets)
+        return cleaned
+
+    if isinstance(value, (list, tuple)):
+        return [sanitize(item, secrets) for item in value]
+
+    if isinstance(value, str):
+        for secret in secrets:
+            if secret:
+                value = value.replace(secret, REDACTED)
+        for pattern, replacement in PII_PATTERNS:
+            value = pattern.sub(replacement, value)
+        return value
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+
+    # datetimes, Decimals and anything else boto3 may hand back
+    return sanitize(str(value), secrets)
+
+
+class Exchange:
+    """
+    Collects everything that happens while serving a single chat request
+    """
+
+    def __init__(self, body, raw_body=None, content_type=None):
+        self.id = str(uuid.uuid4())
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.body = body
+        self.raw_body = raw_body
+        self.content_type = content_type
+        self.mistral_calls = []
+        self.tool_calls = []
+        self._tool_call = None
+        self._tool_started = None
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def add_mistral_call(self, payload, status_code, body, duration_ms, error=None, text=None):
+        # text is the verbatim reply replay serves; body is the parsed copy for reading
+        self.mistral_calls.append({
+            'payload': payload,
+            'status_code': status_code,
+            'response': body,
+            'response_text': text,
+            'error': error,
+            'duration_ms': duration_ms
+        })
+
+    def start_tool_call(self, name, arguments):
+        self._tool_call = {
+            'name': name,
+            'arguments': arguments,
+            'cost_explorer_calls': []
+        }
+        self._tool_started = time.perf_counter()
+
+    def finish_tool_call(self, result, error=None):
+        if self._tool_call is None:
+            return
+        self._tool_call['result'] = result
+        self._tool_call['error'] = error
+        self._tool_call['duration_ms'] = round((time.perf_counter() - self._tool_started) * 1000, 2)
+        self.tool_calls.append(self._tool_call)
+        self._tool_call = None
+
+    def add_cost_explorer_call(self, operation, params, response, duration_ms, error=None):
+        call = {
+            'operation': operation,
+            'params': params,
+            'response': response,
+            'error': error,
+            'duration_ms': duration_ms
+        }
+        if self._tool_call is not None:
+            self._tool_call['cost_explorer_calls'].append(call)
+        else:
+            self.tool_calls.append({'name': None, 'arguments': None, 'cost_explorer_calls': [call]})
+
+    def to_record(self, status_code, body):
+        # Requests whose body was not a JSON object are kept verbatim instead
+        raw_request = None
+        if self.body is None:
+            raw_request = {'body': self.raw_body, 'content_type': self.content_type}
+
+        return {
+            'type': EXCHANGE_TYPE,
+            'id': self.id,
+            'timestamp': datetime.fromtimestamp(self.started_at, tz=timezone.utc).isoformat(),
+            'started_at': self.started_at,
+            'duration_ms': self.elapsed_ms(),
+            'request': self.body,
+            'raw_request': raw_request,
+            'mistral_calls': self.mistral_calls,
+            'tool_calls': self.tool_calls,
+            'response': {'status_code': status_code, 'body': body}
+        }
+
+
+class TrafficRecorder:
+    """
+    Appends sanitized chat exchanges to a JSONL file from a background thread,
+    so request handlers only pay for a queue put
+    """
+
+    def __init__(self, path, secrets=(), flush_interval=1.0, batch_size=100, max_queue_size=10000):
+        self.path = path
+        self.secrets = [s for s in secrets if s]
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._local = threading.local()
+        # Guards _closed so nothing is queued behind the shutdown sentinel
+        self._lock = threading.Lock()
+        self._closed = False
+        self._file = open(path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        logger.info(f"Recording chat traffic to {path}")
+
+    def begin(self, body, raw_body=None, content_type=None):
+        """
+        Start recording an exchange for the current thread; body is the parsed
+        JSON object, or None with the raw body when the request was not one
+        """
+        exchange = Exchange(body, raw_body=raw_body, content_type=content_type)
+        self._local.exchange = exchange
+        return exchange
+
+    def current(self):
+        return getattr(self._local, 'exchange', None)
+
+    def finish(self, status_code, body):
+        """
+        Finish the current thread's exchange and hand it to the writer
+        """
+        exchange = self.current()
+        if exchange is None:
+            return
+        self._local.exchange = None
+        record = exchange.to_record(status_code, body)
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                logger.warning(f"Traffic recorder queue full, dropped exchange {exchange.id} ({self.dropped} dropped so far)")
+
+    def close(self, timeout=10):
+        """
+        Stop accepting exchanges and wait for the writer to drain the queue;
+        the writer thread closes the file itself once it is done
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Traffic recorder still writing to {self.path} after {timeout}s")
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = False
+
+            if record is None:
+                self._write(batch)
+                self._file.close()
+                return
+            if record:
+                batch.append(record)
+
+            if len(batch) >= self.batch_size or (batch and time.monotonic() - last_flush >= self.flush_interval):
+                self._write(batch)
+                batch = []
+                last_flush = time.monotonic()
+
+    def _sanitize_record(self, record):
+        return {
+            key: sanitize(value, self.secrets) if key in CAPTURED_FIELDS else value
+            for key, value in record.items()
+        }
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            lines = [json.dumps(self._sanitize_record(record)) + '\n' for record in batch]
+            self._file.writelines(lines)
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} recorded exchange(s): {str(e)}", exc_info=True)
@@ -0,0 +1,301 @@
+"""
+Replay recorded /api/chat traffic against the app for offline load testing.
+
+Mistral and AWS Cost Explorer are served from the recording, so no credentials
+or network access are needed; without a config.yml the app is loaded with
+placeholder settings. Run it against two builds and compare the
+summaries to see how a change affects throughput and latency.
+
+    python replay.py requests.jsonl --speed 10 --concurrency 32 --output results.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+import yaml
+
+from recorder import EXCHANGE_TYPE
+
+logger = logging.getLogger('replay')
+
+# Settings used when there is no config.yml; upstream calls never leave the process
+PLACEHOLDER_CONFIG = {
+    'mistral': {
+        'api_key': 'replay',
+        'model': 'replay',
+        'api_url': 'http://replay.invalid/v1/chat/completions'
+    },
+    'aws': {
+        'access_key': 'replay',
+        'secret_key': 'replay',
+        'region': 'us-east-1'
+    }
+}
+
+# Recorded exchange and upstream call positions for the worker thread
+_cursor = threading.local()
+
+
+def load_exchanges(path, limit=None):
+    """
+    Load recorded exchanges from a JSONL file, ordered by start time
+    """
+    exchanges = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid JSON on line {line_number}")
+                continue
+            if record.get('type') == EXCHANGE_TYPE:
+                exchanges.append(record)
+
+    exchanges.sort(key=lambda x: x['started_at'])
+    if limit:
+        exchanges = exchanges[:limit]
+    return exchanges
+
+
+class ReplayedResponse:
+    """
+    Minimal stand-in for requests.Response built from a recorded Mistral call
+    """
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class ReplayedCostExplorer:
+    """
+    Stand-in for the boto3 Cost Explorer client serving recorded responses
+    """
+
+    def get_cost_and_usage(self, **params):
+        return self._next('get_cost_and_usage')
+
+    def get_cost_forecast(self, **params):
+        return self._next('get_cost_forecast')
+
+    def _next(self, operation):
+        calls = _cursor.cost_explorer_calls
+        if not calls:
+            raise RuntimeError(f"No recorded Cost Explorer response left for {operation}")
+        call = calls.pop(0)
+        _simulate_latency(call)
+        if call.get('error'):
+            raise RuntimeError(call['error'])
+        return call['response']
+
+
+def replayed_post(url, headers=None, json=None, timeout=None):
+    """
+    Replacement for requests.post serving recorded Mistral responses
+    """
+    calls = _cursor.mistral_calls
+    if not calls:
+        raise requests.exceptions.RequestException("No recorded Mistral response left")
+    call = calls.pop(0)
+    _simulate_latency(call)
+    error = call.get('error')
+    if error:
+        if error.split(':')[0].endswith('Timeout'):
+            raise requests.exceptions.Timeout(error)
+        raise requests.exceptions.RequestException(error)
+    text = call.get('response_text')
+    if text is None:
+        text = json.dumps(call.get('response'))
+    return ReplayedResponse(call['status_code'], text)
+
+
+def _simulate_latency(call):
+    if _cursor.upstream_latency and call.get('duration_ms'):
+        time.sleep(call['duration_ms'] / 1000)
+
+
+def replay_exchange(flask_app, exchange, upstream_latency, due):
+    """
+    Drive one recorded exchange through the app and time it
+
+    Latency is measured from due, the perf_counter time the exchange was
+    scheduled for, so time spent queued behind a full worker pool counts.
+    Service time only covers the request itself.
+    """
+    _cursor.mistral_calls = list(exchange.get('mistral_calls', []))
+    _cursor.cost_explorer_calls = [
+        call
+        for tool_call in exchange.get('tool_calls', [])
+        for call in tool_call.get('cost_explorer_calls', [])
+    ]
+    _cursor.upstream_latency = upstream_latency
+
+    started = time.perf_counter()
+    client = flask_app.test_client()
+    if exchange.get('request') is None:
+        raw_request = exchange.get('raw_request') or {}
+        response = client.post('/api/chat', data=raw_request.get('body') or '',
+                               content_type=raw_request.get('content_type'))
+    else:
+        response = client.post('/api/chat', json=exchange['request'])
+    finished = time.perf_counter()
+
+    recorded = exchange.get('response', {})
+    return {
+        'id': exchange['id'],
+        'status_code': response.status_code,
+        'latency_ms': (finished - due) * 1000,
+        'service_ms': (finished - started) * 1000,
+        'recorded_duration_ms': exchange.get('duration_ms'),
+        'matched': (response.status_code == recorded.get('status_code')
+                    and response.get_json(silent=True) == recorded.get('body'))
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_times(values):
+    return {
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'max': round(max(values), 2) if values else 0.0
+    }
+
+
+def import_app():
+    """
+    Import the app, pointing it at placeholder settings when no config is available
+    """
+    default_config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yml')
+    if os.environ.get('APP_CONFIG') or os.path.exists(default_config):
+        import app
+        return app
+
+    logger.info("No config.yml found, replaying with placeholder settings")
+    with tempfile.NamedTemporaryFile('w', suffix='.yml', delete=False) as f:
+        yaml.safe_dump(PLACEHOLDER_CONFIG, f)
+    os.environ['APP_CONFIG'] = f.name
+    try:
+        import app
+    finally:
+        del os.environ['APP_CONFIG']
+        os.unlink(f.name)
+    return app
+
+
+def run_replay(exchanges, speed=1.0, concurrency=16, upstream_latency=True):
+    """
+    Replay exchanges at their recorded pace divided by speed (0 = as fast as possible)
+    """
+    chat_app = import_app()
+
+    # Never record the replay itself
+    if chat_app.recorder:
+        chat_app.recorder.close()
+        chat_app.recorder = None
+
+    cost_explorer = ReplayedCostExplorer()
+    results = []
+    errors = []
+    first_started_at = exchanges[0]['started_at']
+
+    with mock.patch.object(chat_app.requests, 'post', replayed_post), \
+            mock.patch.object(chat_app, 'ce_client', cost_explorer), \
+            mock.patch.object(chat_app.boto3, 'client', lambda *args, **kwargs: cost_explorer), \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        started = time.perf_counter()
+        for exchange in exchanges:
+            if speed > 0:
+                due = started + (exchange['started_at'] - first_started_at) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                due = time.perf_counter()
+            futures.append(executor.submit(replay_exchange, chat_app.app, exchange, upstream_latency, due))
+
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Replay failed: {str(e)}", exc_info=True)
+                errors.append(str(e))
+        elapsed = time.perf_counter() - started
+
+    latencies = [r['latency_ms'] for r in results]
+    service_times = [r['service_ms'] for r in results]
+    return {
+        'exchanges': len(exchanges),
+        'completed': len(results),
+        'failed': len(errors),
+        'non_200': sum(1 for r in results if r['status_code'] != 200),
+        'mismatched': sum(1 for r in results if not r['matched']),
+        'speed': speed,
+        'concurrency': concurrency,
+        'upstream_latency': upstream_latency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': summarize_times(latencies),
+        'service_ms': summarize_times(service_times)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded chat traffic against the app")
+    parser.add_argument('path', help="JSONL file written by the traffic recorder")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Rate multiplier over the recorded pace; 0 replays as fast as possible")
+    parser.add_argument('--concurrency', type=int, default=16, help="Maximum in-flight exchanges")
+    parser.add_argument('--limit', type=int, help="Only replay the first N exchanges")
+    parser.add_argument('--no-upstream-latency', action='store_true',
+                        help="Serve Mistral and Cost Explorer responses instantly instead of at recorded latency")
+    parser.add_argument('--output', help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    exchanges = load_exchanges(args.path, args.limit)
+    if not exchanges:
+        logger.error(f"No recorded exchanges found in {args.path}")
+        return 1
+
+    logger.info(f"Replaying {len(exchanges)} exchanges at {args.speed}x with concurrency {args.concurrency}")
+    summary = run_replay(
+        exchanges,
+        speed=args.speed,
+        concurrency=args.concurrency,
+        upstream_latency=not args.no_upstream_latency
+    )
+
+    # stdout carries the app's own debug prints, so keep the summary on stderr
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())